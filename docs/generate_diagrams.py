@@ -6,14 +6,37 @@ Usage:
     python docs/generate_diagrams.py                   # All layouts
     python docs/generate_diagrams.py en.xml            # Specific layout(s)
     python docs/generate_diagrams.py en.xml de.xml     # Multiple layouts
+    python docs/generate_diagrams.py --force           # Regenerate all
+    python docs/generate_diagrams.py --gzip            # Write .svgz
 
-Output: SVG files in docs/layouts/
+Output: SVG files in docs/layouts/ (gzip-compressed .svgz with --gzip)
+
+A diagram is only regenerated when its SVG is missing or older than the
+layout XML or this script; pass --force to rebuild regardless.
+
+The drawing hot path (Svg.rect/text, draw_key, draw_6keys, disp,
+font_size_for) carries type annotations, so mypyc can compile the module
+to a C extension.  The gain is small, since most of the time goes to
+str.format and cache lookups that are already C.  Build it in place and
+run via import (the .so must sit in docs/ so the layout paths resolve):
+
+    cd docs && mypyc generate_diagrams.py
+    python -c 'import generate_diagrams; generate_diagrams.main()'
+
+It uses only the standard library and no CPython-specific tricks (such
+as in-place str += accumulation), so it also runs unmodified under
+PyPy: pypy3 docs/generate_diagrams.py
 """
 
 import xml.etree.ElementTree as ET
+import functools
+import gzip
+import io
 import os
 import sys
-from html import escape as html_escape
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, TextIO, cast
 
 # ════════════════════════════════════════════════════════════════════
 # Key constants
@@ -21,20 +44,46 @@ from html import escape as html_escape
 A, B, C, D, E, F = 1, 2, 4, 8, 16, 32
 KEYS = [A, B, C, D, E, F]
 KNAME = {A: 'A', B: 'B', C: 'C', D: 'D', E: 'E', F: 'F'}
-KCOL = {A: 0, B: 0, C: 0, D: 1, E: 1, F: 1}
-KROW = {A: 0, B: 1, C: 2, D: 0, E: 1, F: 2}
-LEFT = {A, B, C}
-RIGHT = {D, E, F}
+# Grid column/row of each key, indexed directly by its bitmask value
+KCOL = tuple({A: 0, B: 0, C: 0, D: 1, E: 1, F: 1}.get(m, 0)
+             for m in range(F + 1))
+KROW = tuple({A: 0, B: 1, C: 2, D: 0, E: 1, F: 2}.get(m, 0)
+             for m in range(F + 1))
+LEFT_MASK = A | B | C
+RIGHT_MASK = D | E | F
+
+# Emit <!-- section --> comments into the SVG (useful when debugging the
+# generator, but they only add size to the published diagrams)
+DEBUG_COMMENTS = False
+
+
+def key_origins(ox, oy, kw, kh, gx, gy):
+    """Return (x_by_col, y_by_row): top-left offsets of the 6-key grid."""
+    return ((ox, ox + (kw + gx)),
+            (oy, oy + (kh + gy), oy + 2 * (kh + gy)))
+
+
+def key_positions(ox, oy, kw, kh, gx, gy):
+    """Return the top-left (x, y) of every key, in KEYS order."""
+    x_by_col, y_by_row = key_origins(ox, oy, kw, kh, gx, gy)
+    return [(x_by_col[KCOL[k]], y_by_row[KROW[k]]) for k in KEYS]
+
+
+# Only 64 chord masks exist, so per-mask lookups are tabulated at import
+_BITS = tuple(tuple(k for k in KEYS if m & k) for m in range(64))
+_LABEL = tuple(''.join(KNAME[k] for k in _BITS[m]) for m in range(64))
+_ROWS_BY_MASK = tuple(tuple(sorted(KROW[k] for k in _BITS[m]))
+                      for m in range(64))
 
 
 def bits(mask):
-    """Return list of key constants pressed in bitmask."""
-    return [k for k in KEYS if mask & k]
+    """Return tuple of key constants pressed in bitmask."""
+    return _BITS[mask]
 
 
 def chord_label(mask):
     """Human-readable chord name like 'AB', 'DEF'."""
-    return ''.join(KNAME[k] for k in bits(mask))
+    return _LABEL[mask]
 
 
 # ════════════════════════════════════════════════════════════════════
@@ -58,7 +107,8 @@ _ACTION = {
 }
 
 
-def disp(val):
+@functools.lru_cache(maxsize=1024)
+def disp(val: str) -> str:
     """Convert layout value to a display string."""
     if not val:
         return ''
@@ -68,12 +118,19 @@ def disp(val):
     return val.rstrip()
 
 
-def esc(s):
+# Same replacements as html.escape(), applied in a single C-level pass
+_ESCAPES = str.maketrans({
+    '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#x27;',
+})
+
+
+def esc(s: str) -> str:
     """XML-escape a string for SVG text content."""
-    return html_escape(str(s))
+    return str(s).translate(_ESCAPES)
 
 
-def font_size_for(char, base_size):
+@functools.lru_cache(maxsize=1024)
+def font_size_for(char: str, base_size: int) -> int:
     """Return an adjusted font size based on character length."""
     n = len(char)
     if n <= 1:
@@ -88,61 +145,111 @@ def font_size_for(char, base_size):
 # ════════════════════════════════════════════════════════════════════
 # Layout XML parsing
 # ════════════════════════════════════════════════════════════════════
+def _column() -> list[str]:
+    return [''] * 64
+
+
+@dataclass
+class Entries:
+    """A layout's chord table in column form, indexed by chord bitmask.
+
+    Each column holds the disp()-converted display string for all 64
+    masks ('' where undefined); present[mask] tells whether the layout
+    defines that chord at all.
+    """
+    present: list[bool] = field(default_factory=lambda: [False] * 64)
+    abc: list[str] = field(default_factory=_column)
+    abc_shift: list[str] = field(default_factory=_column)
+    num: list[str] = field(default_factory=_column)
+    num_shift: list[str] = field(default_factory=_column)
+    symb: list[str] = field(default_factory=_column)
+    symb_shift: list[str] = field(default_factory=_column)
+
+
 def parse_layout(path):
     """Parse a GKOS layout XML file.
 
-    Returns (layout_id, layout_name, entries) where entries is
-    {chord_bitmask: {'abc': ..., 'abc_shift': ..., 'num': ..., ...}}.
+    Returns (layout_id, layout_name, entries) where entries is an
+    Entries table of display strings, e.g. entries.abc[chord_bitmask].
     """
-    tree = ET.parse(path)
-    root = tree.getroot()
-    entries = {}
+    root = ET.parse(path).getroot()
+    entries = Entries()
+    intern = sys.intern
     for el in root.findall('entry'):
-        ch = int(el.get('chord'))
-        entries[ch] = {
-            'abc': el.get('abc', ''),
-            'abc_shift': el.get('abc_shift', ''),
-            'num': el.get('num', ''),
-            'num_shift': el.get('num_shift', ''),
-            'symb': el.get('symb', ''),
-            'symb_shift': el.get('symb_shift', ''),
-        }
+        # Values repeat heavily across entries (digits, '', common chars);
+        # interning shares one object per value and makes the disp()
+        # cache hit on an identity compare
+        get = el.get
+        ch = int(get('chord'))
+        entries.present[ch] = True
+        entries.abc[ch] = disp(intern(get('abc', '')))
+        entries.abc_shift[ch] = disp(intern(get('abc_shift', '')))
+        entries.num[ch] = disp(intern(get('num', '')))
+        entries.num_shift[ch] = disp(intern(get('num_shift', '')))
+        entries.symb[ch] = disp(intern(get('symb', '')))
+        entries.symb_shift[ch] = disp(intern(get('symb_shift', '')))
     return root.get('id'), root.get('name'), entries
 
 
 # ════════════════════════════════════════════════════════════════════
 # SVG builder
 # ════════════════════════════════════════════════════════════════════
+_RECT_TMPL = '<rect x="{:.1f}" y="{:.1f}" width="{:.1f}" height="{:.1f}" {}/>\n'
+_TEXT_TMPL = '<text x="{:.1f}" y="{:.1f}" {}>{}</text>\n'
+
+
+@functools.lru_cache(maxsize=256, typed=True)
+def _rect_attrs(fill: str, stroke: str, sw: int | float,
+                rx: int | float) -> str:
+    """Pre-built style attributes for a (fill, stroke, width, rx) combo."""
+    return f'fill="{fill}" stroke="{stroke}" stroke-width="{sw}" rx="{rx}"'
+
+
+@functools.lru_cache(maxsize=256, typed=True)
+def _text_attrs(sz: int, fill: str, anchor: str, weight: str,
+                bl: str) -> str:
+    """Pre-built style attributes for a text style combo."""
+    return (f'font-size="{sz}" fill="{fill}" text-anchor="{anchor}" '
+            f'font-weight="{weight}" dominant-baseline="{bl}"')
+
+
 class Svg:
-    """Minimal SVG string builder."""
+    """Minimal SVG builder.
 
-    def __init__(self):
-        self._parts = []
+    Markup is written to the text file object `out` as it is produced,
+    or collected in memory (see body()) when no file is given.
+    """
 
-    def _a(self, s):
-        self._parts.append(s)
-
-    def rect(self, x, y, w, h, **kw):
-        fill = kw.get('fill', 'white')
-        stroke = kw.get('stroke', '#333')
-        sw = kw.get('stroke_width', 1.5)
-        rx = kw.get('rx', 5)
-        self._a(
-            f'<rect x="{x:.1f}" y="{y:.1f}" width="{w:.1f}" height="{h:.1f}" '
-            f'fill="{fill}" stroke="{stroke}" stroke-width="{sw}" rx="{rx}"/>'
-        )
+    def __init__(self, out: TextIO | None = None) -> None:
+        self._buf: TextIO = out if out is not None else io.StringIO()
 
-    def text(self, x, y, txt, **kw):
-        sz = kw.get('size', 14)
-        fill = kw.get('fill', 'black')
-        anchor = kw.get('anchor', 'middle')
-        weight = kw.get('weight', 'normal')
-        bl = kw.get('baseline', 'central')
-        self._a(
-            f'<text x="{x:.1f}" y="{y:.1f}" font-size="{sz}" fill="{fill}" '
-            f'text-anchor="{anchor}" font-weight="{weight}" '
-            f'dominant-baseline="{bl}">{esc(txt)}</text>'
-        )
+    def _a(self, s):
+        self._buf.write(s)
+        self._buf.write('\n')
+
+    # Style values stay int | float: they are written with str(), so an int
+    # must not be widened to float (stroke-width="1", not "1.0")
+    def rect(self, x: float, y: float, w: float, h: float, *,
+             fill: str = 'white', stroke: str = '#333',
+             stroke_width: int | float = 1.5, rx: int | float = 5) -> None:
+        attrs = _rect_attrs(fill, stroke, stroke_width, rx)
+        self._buf.write(_RECT_TMPL.format(x, y, w, h, attrs))
+
+    def text(self, x: float, y: float, txt: str, *, size: int = 14,
+             fill: str = 'black', anchor: str = 'middle',
+             weight: str = 'normal', baseline: str = 'central') -> None:
+        if txt == '':
+            return
+        attrs = _text_attrs(size, fill, anchor, weight, baseline)
+        self._buf.write(_TEXT_TMPL.format(x, y, attrs, esc(txt)))
+
+    def raw(self, s):
+        """Append already-rendered SVG markup verbatim."""
+        self._buf.write(s)
+
+    def body(self) -> str:
+        """Return the markup written so far (in-memory builders only)."""
+        return cast(io.StringIO, self._buf).getvalue()
 
     def open_g(self, tx=0, ty=0):
         if tx or ty:
@@ -154,11 +261,13 @@ class Svg:
         self._a('</g>')
 
     def comment(self, s):
+        """Write an XML comment.  Callers check DEBUG_COMMENTS first, so the
+        label is never formatted for published diagrams."""
         self._a(f'<!-- {s} -->')
 
-    def build(self, w, h):
-        body = '\n'.join(self._parts)
-        return (
+    def begin(self, w, h):
+        """Write the document prologue for a w x h drawing."""
+        self._buf.write(
             f'<?xml version="1.0" encoding="UTF-8"?>\n'
             f'<svg xmlns="http://www.w3.org/2000/svg" '
             f'viewBox="0 0 {w} {h}" width="{w}" height="{h}">\n'
@@ -167,16 +276,19 @@ class Svg:
             f'Arial, sans-serif; }}\n'
             f'</style></defs>\n'
             f'<rect width="{w}" height="{h}" fill="white"/>\n'
-            f'{body}\n'
-            f'</svg>\n'
         )
 
+    def end(self):
+        """Close the document."""
+        self._buf.write('</svg>\n')
+
 
 # ════════════════════════════════════════════════════════════════════
 # Drawing primitives
 # ════════════════════════════════════════════════════════════════════
-def draw_key(svg, x, y, w, h, char='', pressed=False, font_size=18,
-             text_fill=None, dimmed=False):
+def draw_key(svg: Svg, x: float, y: float, w: float, h: float,
+             char: str = '', pressed: bool = False, font_size: int = 18,
+             text_fill: str | None = None, dimmed: bool = False) -> None:
     """Draw a single rounded-rect key with optional character."""
     if pressed:
         svg.rect(x, y, w, h, fill='#222', stroke='#222', rx=4, stroke_width=1.5)
@@ -192,19 +304,15 @@ def draw_key(svg, x, y, w, h, char='', pressed=False, font_size=18,
         svg.text(x + w / 2, y + h / 2, char, size=fs, fill=fill, weight='bold')
 
 
-def draw_6keys(svg, ox, oy, kw, kh, gx, gy, key_info):
+def draw_6keys(svg: Svg, ox: float, oy: float, kw: float, kh: float,
+               gx: float, gy: float, key_info: list[dict[str, Any]]) -> None:
     """Draw the 6-key keyboard grid.
 
     key_info: list of 6 dicts (one per key in KEYS order):
         {'char': str, 'pressed': bool, 'font_size': int,
          'text_fill': str|None, 'dimmed': bool}
     """
-    for i, key in enumerate(KEYS):
-        col = KCOL[key]
-        row = KROW[key]
-        x = ox + col * (kw + gx)
-        y = oy + row * (kh + gy)
-        info = key_info[i]
+    for (x, y), info in zip(key_positions(ox, oy, kw, kh, gx, gy), key_info):
         draw_key(svg, x, y, kw, kh,
                  char=info.get('char', ''),
                  pressed=info.get('pressed', False),
@@ -213,6 +321,27 @@ def draw_6keys(svg, ox, oy, kw, kh, gx, gy, key_info):
                  dimmed=info.get('dimmed', False))
 
 
+# Rendered mini keyboards keyed by (mask, position, geometry).  Every
+# layout places its cells at the same coordinates, so after the first
+# diagram these are all cache hits.
+_MINI_KB: dict[tuple[int, float, float, float, float, float, float],
+               str] = {}
+
+
+def draw_mini_keyboard(svg, ox, oy, kw, kh, gx, gy, chord_mask):
+    """Draw a character-less 6-key grid with the chord's keys pressed."""
+    cache_key = (chord_mask, ox, oy, kw, kh, gx, gy)
+    fragment = _MINI_KB.get(cache_key)
+    if fragment is None:
+        key_info = [{'pressed': bool(key & chord_mask),
+                     'dimmed': not key & chord_mask}
+                    for key in KEYS]
+        scratch = Svg()
+        draw_6keys(scratch, ox, oy, kw, kh, gx, gy, key_info)
+        fragment = _MINI_KB[cache_key] = scratch.body()
+    svg.raw(fragment)
+
+
 # ════════════════════════════════════════════════════════════════════
 # Diagram section drawing
 # ════════════════════════════════════════════════════════════════════
@@ -237,27 +366,13 @@ def draw_center_cell(svg, cx, cy, entries):
     ox = cx - total_w / 2
     oy = cy - total_h / 2
 
-    key_info = []
-    for key in KEYS:
-        e = entries.get(key)
-        char = disp(e['abc']) if e else ''
-        key_info.append({'char': char, 'pressed': False, 'font_size': 24})
-    draw_6keys(svg, ox, oy, kw, kh, gx, gy, key_info)
-
-    # NUM (gray) and SYMB (blue) annotations outside every key
-    for key in KEYS:
-        e = entries.get(key)
-        if not e:
-            continue
-        col = KCOL[key]
-        row = KROW[key]
-        kx = ox + col * (kw + gx)
-        ky = oy + row * (kh + gy)
-
-        num_char = disp(e['num'])
-        symb_char = disp(e['symb'])
+    # Each key with its NUM (gray) and SYMB (blue) annotations outside it
+    for key, (kx, ky) in zip(KEYS, key_positions(ox, oy, kw, kh, gx, gy)):
+        draw_key(svg, kx, ky, kw, kh, char=entries.abc[key], font_size=24)
+        num_char = entries.num[key]
+        symb_char = entries.symb[key]
 
-        if key in LEFT:
+        if key & LEFT_MASK:
             _draw_num_symb(svg, kx - 7, ky + kh * 0.30, ky + kh * 0.72,
                            num_char, symb_char, 'end', 12, 11)
         else:
@@ -279,58 +394,52 @@ def draw_inner_chord_cell(svg, cx, cy, entries, base_chord):
     total_h = 3 * kh + 2 * gy
     ox = cx - total_w / 2
     oy = cy - total_h / 2
+    x_by_col, y_by_row = key_origins(ox, oy, kw, kh, gx, gy)
 
-    pressed = set(bits(base_chord))
-    base_entry = entries.get(base_chord)
-    base_char = disp(base_entry['abc']) if base_entry else ''
-    base_num = disp(base_entry['num']) if base_entry else ''
-    base_symb = disp(base_entry['symb']) if base_entry else ''
+    base_char = entries.abc[base_chord]
+    base_num = entries.num[base_chord]
+    base_symb = entries.symb[base_chord]
 
     # Opposite side for 3-key extensions
-    pressed_on_left = pressed <= LEFT
-    pressed_on_right = pressed <= RIGHT
+    pressed_on_left = not base_chord & ~LEFT_MASK
+    pressed_on_right = not base_chord & ~RIGHT_MASK
     if pressed_on_left:
-        ext_side = RIGHT
+        ext_mask = RIGHT_MASK
     elif pressed_on_right:
-        ext_side = LEFT
+        ext_mask = LEFT_MASK
     else:
-        ext_side = set()
-
-    # Collect extension data: abc, num, symb per key
-    ext_data = {}
-    for key in ext_side:
-        ext_chord = base_chord | key
-        ext_entry = entries.get(ext_chord)
-        if ext_entry:
-            ext_data[key] = (
-                disp(ext_entry['abc']),
-                disp(ext_entry['num']),
-                disp(ext_entry['symb']),
-            )
+        ext_mask = 0
 
     # Detect non-adjacent pair (AC or DF) for badge offset
-    pressed_rows = sorted([KROW[k] for k in pressed])
+    pressed_rows = _ROWS_BY_MASK[base_chord]
     is_non_adjacent = (pressed_rows[-1] - pressed_rows[0]) > 1
 
-    # Draw 6 keys: pressed=black, extensions=white+char, rest=dimmed
-    key_info = []
-    for key in KEYS:
-        if key in pressed:
-            key_info.append({'char': '', 'pressed': True, 'font_size': 14})
-        elif key in ext_data:
-            key_info.append({
-                'char': ext_data[key][0], 'pressed': False, 'font_size': 13
-            })
+    # Draw 6 keys: pressed=black, extensions=white+char with NUM/SYMB
+    # annotations outside the key, rest=dimmed
+    for key, (kx, ky) in zip(KEYS, key_positions(ox, oy, kw, kh, gx, gy)):
+        if key & base_chord:
+            draw_key(svg, kx, ky, kw, kh, pressed=True, font_size=14)
+            continue
+        ext_chord = base_chord | key
+        if not (key & ext_mask and entries.present[ext_chord]):
+            draw_key(svg, kx, ky, kw, kh, dimmed=True)
+            continue
+        draw_key(svg, kx, ky, kw, kh, char=entries.abc[ext_chord],
+                 font_size=13)
+        ext_num = entries.num[ext_chord]
+        ext_symb = entries.symb[ext_chord]
+        if key & LEFT_MASK:
+            _draw_num_symb(svg, kx - 4, ky + kh * 0.30, ky + kh * 0.72,
+                           ext_num, ext_symb, 'end', 9, 8)
         else:
-            key_info.append({'char': '', 'pressed': False, 'dimmed': True})
-    draw_6keys(svg, ox, oy, kw, kh, gx, gy, key_info)
+            _draw_num_symb(svg, kx + kw + 4, ky + kh * 0.30, ky + kh * 0.72,
+                           ext_num, ext_symb, 'start', 9, 8)
 
     # Floating badge for base chord character between pressed keys
     if base_char:
-        col = KCOL[list(pressed)[0]]
-        lx = ox + col * (kw + gx) + kw / 2
-        y_top = oy + pressed_rows[0] * (kh + gy) + kh / 2
-        y_bot = oy + pressed_rows[-1] * (kh + gy) + kh / 2
+        lx = x_by_col[KCOL[bits(base_chord)[0]]] + kw / 2
+        y_top = y_by_row[pressed_rows[0]] + kh / 2
+        y_bot = y_by_row[pressed_rows[-1]] + kh / 2
         ly = (y_top + y_bot) / 2
 
         # Issue 4: offset badge outward for non-adjacent pairs
@@ -357,22 +466,6 @@ def draw_inner_chord_cell(svg, cx, cy, entries, base_chord):
         _draw_num_symb(svg, ann_x, ly - 6, ly + 6,
                        base_num, base_symb, anchor, 9, 8)
 
-    # NUM/SYMB annotations for extension keys (outside the key)
-    for key in ext_side:
-        if key not in ext_data:
-            continue
-        _, ext_num, ext_symb = ext_data[key]
-        key_col = KCOL[key]
-        key_row = KROW[key]
-        kx = ox + key_col * (kw + gx)
-        ky = oy + key_row * (kh + gy)
-        if key in LEFT:
-            _draw_num_symb(svg, kx - 4, ky + kh * 0.30, ky + kh * 0.72,
-                           ext_num, ext_symb, 'end', 9, 8)
-        else:
-            _draw_num_symb(svg, kx + kw + 4, ky + kh * 0.30, ky + kh * 0.72,
-                           ext_num, ext_symb, 'start', 9, 8)
-
 
 def draw_outer_chord_cell(svg, cx, cy, entries, chord_mask,
                           cell_w=95, cell_h=116):
@@ -381,10 +474,9 @@ def draw_outer_chord_cell(svg, cx, cy, entries, chord_mask,
     Taller cell with ABC char at top, mini keyboard in middle,
     and gray NUM / blue SYMB at bottom.
     """
-    entry = entries.get(chord_mask)
-    char = disp(entry['abc']) if entry else ''
-    num_char = disp(entry['num']) if entry else ''
-    symb_char = disp(entry['symb']) if entry else ''
+    char = entries.abc[chord_mask]
+    num_char = entries.num[chord_mask]
+    symb_char = entries.symb[chord_mask]
 
     svg.rect(cx - cell_w / 2, cy - cell_h / 2, cell_w, cell_h,
              fill='#fafafa', stroke='#ddd', stroke_width=1, rx=7)
@@ -403,14 +495,7 @@ def draw_outer_chord_cell(svg, cx, cy, entries, chord_mask,
     kb_ox = cx - kb_w / 2
     kb_oy = cy - kb_h / 2 - 2
 
-    pressed = set(bits(chord_mask))
-    key_info = []
-    for key in KEYS:
-        key_info.append({
-            'char': '', 'pressed': key in pressed,
-            'font_size': 7, 'dimmed': key not in pressed
-        })
-    draw_6keys(svg, kb_ox, kb_oy, mkw, mkh, mgx, mgy, key_info)
+    draw_mini_keyboard(svg, kb_ox, kb_oy, mkw, mkh, mgx, mgy, chord_mask)
 
     # Gray NUM and blue SYMB near bottom
     bottom = cy + cell_h / 2
@@ -421,10 +506,9 @@ def draw_outer_chord_cell(svg, cx, cy, entries, chord_mask,
 def draw_direction_cell(svg, cx, cy, entries, chord_mask,
                         cell_w=82, cell_h=95):
     """Draw a navigation/action chord cell."""
-    entry = entries.get(chord_mask)
-    char = disp(entry['abc']) if entry else ''
-    num_char = disp(entry['num']) if entry else ''
-    symb_char = disp(entry['symb']) if entry else ''
+    char = entries.abc[chord_mask]
+    num_char = entries.num[chord_mask]
+    symb_char = entries.symb[chord_mask]
 
     svg.rect(cx - cell_w / 2, cy - cell_h / 2, cell_w, cell_h,
              fill='#f0f4ff', stroke='#b0c0e0', stroke_width=1, rx=7)
@@ -437,14 +521,7 @@ def draw_direction_cell(svg, cx, cy, entries, chord_mask,
     kb_ox = cx - kb_w / 2
     kb_oy = cy - kb_h / 2 + 6
 
-    pressed = set(bits(chord_mask))
-    key_info = []
-    for key in KEYS:
-        key_info.append({
-            'char': '', 'pressed': key in pressed,
-            'font_size': 6, 'dimmed': key not in pressed
-        })
-    draw_6keys(svg, kb_ox, kb_oy, mkw, mkh, mgx, mgy, key_info)
+    draw_mini_keyboard(svg, kb_ox, kb_oy, mkw, mkh, mgx, mgy, chord_mask)
 
     if char:
         fs = font_size_for(char, 16)
@@ -460,9 +537,8 @@ def draw_direction_cell(svg, cx, cy, entries, chord_mask,
 def draw_mode_cell(svg, cx, cy, entries, chord_mask, label,
                    cell_w=95, cell_h=95):
     """Draw a mode switch chord cell."""
-    entry = entries.get(chord_mask)
-    num_char = disp(entry['num']) if entry else ''
-    symb_char = disp(entry['symb']) if entry else ''
+    num_char = entries.num[chord_mask]
+    symb_char = entries.symb[chord_mask]
 
     svg.rect(cx - cell_w / 2, cy - cell_h / 2, cell_w, cell_h,
              fill='#fff8f0', stroke='#e0c8a0', stroke_width=1, rx=7)
@@ -474,14 +550,7 @@ def draw_mode_cell(svg, cx, cy, entries, chord_mask, label,
     kb_ox = cx - kb_w / 2
     kb_oy = cy - kb_h / 2 + 6
 
-    pressed = set(bits(chord_mask))
-    key_info = []
-    for key in KEYS:
-        key_info.append({
-            'char': '', 'pressed': key in pressed,
-            'font_size': 6, 'dimmed': key not in pressed
-        })
-    draw_6keys(svg, kb_ox, kb_oy, mkw, mkh, mgx, mgy, key_info)
+    draw_mini_keyboard(svg, kb_ox, kb_oy, mkw, mkh, mgx, mgy, chord_mask)
 
     svg.text(cx, cy - cell_h / 2 + 18, label,
              size=13, fill='#333', weight='bold')
@@ -495,9 +564,8 @@ def draw_mode_cell(svg, cx, cy, entries, chord_mask, label,
 def draw_control_cell(svg, cx, cy, entries, chord_mask, label,
                       cell_w=95, cell_h=95):
     """Draw a 5-key control chord cell (Esc, Enter, Tab, etc.)."""
-    entry = entries.get(chord_mask)
-    num_char = disp(entry['num']) if entry else ''
-    symb_char = disp(entry['symb']) if entry else ''
+    num_char = entries.num[chord_mask]
+    symb_char = entries.symb[chord_mask]
 
     svg.rect(cx - cell_w / 2, cy - cell_h / 2, cell_w, cell_h,
              fill='#f4f0ff', stroke='#c0b0e0', stroke_width=1, rx=7)
@@ -509,14 +577,7 @@ def draw_control_cell(svg, cx, cy, entries, chord_mask, label,
     kb_ox = cx - kb_w / 2
     kb_oy = cy - kb_h / 2 + 6
 
-    pressed = set(bits(chord_mask))
-    key_info = []
-    for key in KEYS:
-        key_info.append({
-            'char': '', 'pressed': key in pressed,
-            'font_size': 6, 'dimmed': key not in pressed
-        })
-    draw_6keys(svg, kb_ox, kb_oy, mkw, mkh, mgx, mgy, key_info)
+    draw_mini_keyboard(svg, kb_ox, kb_oy, mkw, mkh, mgx, mgy, chord_mask)
 
     svg.text(cx, cy - cell_h / 2 + 18, label,
              size=13, fill='#333', weight='bold')
@@ -531,9 +592,69 @@ def draw_control_cell(svg, cx, cy, entries, chord_mask, label,
 # Main diagram assembly
 # ════════════════════════════════════════════════════════════════════
 
-def generate_svg(layout_id, layout_name, entries, variant=''):
-    """Generate the complete SVG chord reference diagram."""
-    svg = Svg()
+# (row, col, chord) cells inside the main 5x3 grid
+INNER_CHORDS = (
+    (0, 1, A | B),
+    (0, 3, D | E),
+    (1, 0, A | C),
+    (1, 4, D | F),
+    (2, 1, B | C),
+    (2, 3, E | F),
+)
+
+# (row, col, chord) cells of the left outer panel
+LEFT_OUTER = (
+    (0, 0, A | E),
+    (0, 1, A | B | E | F),
+    (1, 0, A | C | E | F),
+    (1, 1, A | C | D | E),
+    (2, 0, C | E),
+    (2, 1, C | D),
+)
+
+# (row, col, chord) cells of the right outer panel
+RIGHT_OUTER = (
+    (0, 0, B | C | D | E),
+    (0, 1, B | D),
+    (1, 0, A | B | D | F),
+    (1, 1, B | C | D | F),
+    (2, 0, A | F),
+    (2, 1, B | F),
+)
+
+# (row, col, chord) cells of the 2x2 navigation block
+DIR_CHORDS = (
+    (0, 0, A | D),
+    (0, 1, A | B | D | E),
+    (1, 0, C | F),
+    (1, 1, B | C | E | F),
+)
+
+# (chord, label) mode switch cells, left to right
+MODES = (
+    (B | E, 'SHIFT'),
+    (A | C | D | F, 'SYMB'),
+    (A | B | C | D | E | F, 'ABC\u21c4123'),
+)
+
+# (chord, label) 5-key control cells, left to right
+CTRL_CHORDS = (
+    (A | B | C | D | E, 'Esc'),          # ABCDE
+    (A | B | C | D | F, 'Ctrl'),         # ABCDF
+    (A | B | C | E | F, 'Alt'),          # ABCEF
+    (A | B | D | E | F, '\u23ce Enter'), # ABDEF
+    (A | C | D | E | F, '\u21e5 Tab'),   # ACDEF
+    (B | C | D | E | F, '\u2326 Del'),   # BCDEF
+)
+
+
+def generate_svg(layout_id, layout_name, entries, variant='', out=None):
+    """Generate the complete SVG chord reference diagram.
+
+    The document is streamed to the text file `out` if given; otherwise
+    it is returned as a string.
+    """
+    svg = Svg(out)
 
     # ── Layout geometry ───────────────────────────────────────────
     col_w = [130, 125, 175, 125, 130]
@@ -581,6 +702,7 @@ def generate_svg(layout_id, layout_name, entries, variant=''):
     # Total dimensions
     total_w = int(outer_right_x + outer_panel_w + 12)
     total_h = int(ctrl_row_y + dir_ch + 20)
+    svg.begin(total_w, total_h)
 
     # ── Title ─────────────────────────────────────────────────────
     title = layout_name or layout_id
@@ -599,73 +721,48 @@ def generate_svg(layout_id, layout_name, entries, variant=''):
     # ── Center cell ───────────────────────────────────────────────
     ccx = main_box_x + col_x[2] + col_w[2] / 2
     ccy = main_box_y + row_y[1] + row_h[1] / 2
-    svg.comment('Center: single keys')
+    if DEBUG_COMMENTS:
+        svg.comment('Center: single keys')
     draw_center_cell(svg, ccx, ccy, entries)
 
     # ── Inner chord cells ─────────────────────────────────────────
-    inner_chords = [
-        (0, 1, A | B),
-        (0, 3, D | E),
-        (1, 0, A | C),
-        (1, 4, D | F),
-        (2, 1, B | C),
-        (2, 3, E | F),
-    ]
-    for row, col, chord in inner_chords:
+    for row, col, chord in INNER_CHORDS:
         icx = main_box_x + col_x[col] + col_w[col] / 2
         icy = main_box_y + row_y[row] + row_h[row] / 2
-        svg.comment(f'Inner chord: {chord_label(chord)}')
+        if DEBUG_COMMENTS:
+            svg.comment(f'Inner chord: {chord_label(chord)}')
         draw_inner_chord_cell(svg, icx, icy, entries, chord)
 
     # ── Outer chord cells (left panel) ────────────────────────────
-    left_outer = [
-        (0, 0, A | E),
-        (0, 1, A | B | E | F),
-        (1, 0, A | C | E | F),
-        (1, 1, A | C | D | E),
-        (2, 0, C | E),
-        (2, 1, C | D),
-    ]
     outer_v_total = main_h + 2 * main_pad
     outer_v_gap = (outer_v_total - 3 * outer_ch) / 2
-    for row, col, chord in left_outer:
+    for row, col, chord in LEFT_OUTER:
         ocx = outer_left_x + col * (outer_cw + 8) + outer_cw / 2
         ocy = main_box_y - main_pad + row * (outer_ch + outer_v_gap) + outer_ch / 2
-        svg.comment(f'Left outer: {chord_label(chord)}')
+        if DEBUG_COMMENTS:
+            svg.comment(f'Left outer: {chord_label(chord)}')
         draw_outer_chord_cell(svg, ocx, ocy, entries, chord,
                               cell_w=outer_cw - 2, cell_h=outer_ch - 2)
 
     # ── Outer chord cells (right panel) ───────────────────────────
-    right_outer = [
-        (0, 0, B | C | D | E),
-        (0, 1, B | D),
-        (1, 0, A | B | D | F),
-        (1, 1, B | C | D | F),
-        (2, 0, A | F),
-        (2, 1, B | F),
-    ]
-    for row, col, chord in right_outer:
+    for row, col, chord in RIGHT_OUTER:
         ocx = outer_right_x + col * (outer_cw + 8) + outer_cw / 2
         ocy = main_box_y - main_pad + row * (outer_ch + outer_v_gap) + outer_ch / 2
-        svg.comment(f'Right outer: {chord_label(chord)}')
+        if DEBUG_COMMENTS:
+            svg.comment(f'Right outer: {chord_label(chord)}')
         draw_outer_chord_cell(svg, ocx, ocy, entries, chord,
                               cell_w=outer_cw - 2, cell_h=outer_ch - 2)
 
     # ── Below: Directions ─────────────────────────────────────────
-    svg.comment('Directions section')
+    if DEBUG_COMMENTS:
+        svg.comment('Directions section')
     dir_cw, dir_ch = 82, 95
     dir_gx, dir_gy = 5, 5
     dir_block_w = 2 * dir_cw + dir_gx
     dir_center_x = main_box_x + main_w / 2 + main_pad
     dir_ox = dir_center_x - dir_block_w / 2
 
-    dir_chords = [
-        (0, 0, A | D),
-        (0, 1, A | B | D | E),
-        (1, 0, C | F),
-        (1, 1, B | C | E | F),
-    ]
-    for row, col, chord in dir_chords:
+    for row, col, chord in DIR_CHORDS:
         dcx = dir_ox + col * (dir_cw + dir_gx) + dir_cw / 2
         dcy = below_y + row * (dir_ch + dir_gy) + dir_ch / 2
         draw_direction_cell(svg, dcx, dcy, entries, chord,
@@ -685,17 +782,13 @@ def generate_svg(layout_id, layout_name, entries, variant=''):
                         cell_w=dir_cw, cell_h=dir_ch)
 
     # ── Mode switches ─────────────────────────────────────────────
-    svg.comment('Mode switches')
+    if DEBUG_COMMENTS:
+        svg.comment('Mode switches')
     mode_cw = 95
     mode_gap = 8
     mode_start_x = def_cx + dir_cw / 2 + 28
 
-    modes = [
-        (B | E, 'SHIFT'),
-        (A | C | D | F, 'SYMB'),
-        (A | B | C | D | E | F, 'ABC\u21c4123'),
-    ]
-    for i, (chord, label) in enumerate(modes):
+    for i, (chord, label) in enumerate(MODES):
         mcx = mode_start_x + i * (mode_cw + mode_gap) + mode_cw / 2
         draw_mode_cell(svg, mcx, dir_mid_y, entries, chord, label,
                        cell_w=mode_cw, cell_h=dir_ch)
@@ -709,35 +802,69 @@ def generate_svg(layout_id, layout_name, entries, variant=''):
              size=10, fill='#aaa')
 
     # ── 5-key control chords ──────────────────────────────────────
-    svg.comment('5-key control chords')
+    if DEBUG_COMMENTS:
+        svg.comment('5-key control chords')
     ctrl_cw = 95
     ctrl_gap = 8
-    ctrl_chords = [
-        (A | B | C | D | E, 'Esc'),          # ABCDE
-        (A | B | C | D | F, 'Ctrl'),         # ABCDF
-        (A | B | C | E | F, 'Alt'),          # ABCEF
-        (A | B | D | E | F, '\u23ce Enter'), # ABDEF
-        (A | C | D | E | F, '\u21e5 Tab'),   # ACDEF
-        (B | C | D | E | F, '\u2326 Del'),   # BCDEF
-    ]
-    ctrl_total_w = len(ctrl_chords) * ctrl_cw + (len(ctrl_chords) - 1) * ctrl_gap
+    ctrl_total_w = len(CTRL_CHORDS) * ctrl_cw + (len(CTRL_CHORDS) - 1) * ctrl_gap
     ctrl_start_x = main_box_x + main_w / 2 + main_pad - ctrl_total_w / 2
 
     svg.text(ctrl_start_x + ctrl_total_w / 2, ctrl_row_y - 8,
              '5-Key Control Chords', size=10, fill='#aaa')
 
-    for i, (chord, label) in enumerate(ctrl_chords):
+    for i, (chord, label) in enumerate(CTRL_CHORDS):
         ccx = ctrl_start_x + i * (ctrl_cw + ctrl_gap) + ctrl_cw / 2
         ccy = ctrl_row_y + dir_ch / 2
         draw_control_cell(svg, ccx, ccy, entries, chord, label,
                           cell_w=ctrl_cw, cell_h=dir_ch)
 
-    return svg.build(total_w, total_h)
+    svg.end()
+    return None if out is not None else svg.body()
 
 
 # ════════════════════════════════════════════════════════════════════
 # CLI
 # ════════════════════════════════════════════════════════════════════
+def is_up_to_date(path, out_path, script_mtime):
+    """True if out_path exists and is newer than both its layout and the script."""
+    try:
+        out_mtime = os.stat(out_path).st_mtime
+    except FileNotFoundError:
+        return False
+    return out_mtime >= max(os.stat(path).st_mtime, script_mtime)
+
+
+def process_layout(path, out_path):
+    """Parse one layout XML, render its diagram to out_path and return it."""
+    layout_id, layout_name, entries = parse_layout(path)
+    fname = os.path.basename(path)
+    variant = 'Standard' if '-standard' in fname else 'Optimized'
+    # Stream into a temporary file rather than holding the whole document,
+    # and only move it into place once complete: an interrupted render must
+    # not leave a truncated diagram that is_up_to_date() later trusts
+    tmp_path = out_path + '.tmp'
+    try:
+        if out_path.endswith('.svgz'):
+            # mtime=0 and the final (not temporary) name keep the gzip
+            # header fixed, so unchanged diagrams compress to identical bytes
+            with open(tmp_path, 'wb') as raw, \
+                    gzip.GzipFile(os.path.basename(out_path), 'wb',
+                                  fileobj=raw, mtime=0) as gz, \
+                    io.TextIOWrapper(gz, encoding='utf-8', newline='\n') as f:
+                generate_svg(layout_id, layout_name, entries, variant, out=f)
+        else:
+            with open(tmp_path, 'w', encoding='utf-8', newline='\n') as f:
+                generate_svg(layout_id, layout_name, entries, variant, out=f)
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    return out_path
+
+
 def main():
     script_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.dirname(script_dir)
@@ -746,11 +873,12 @@ def main():
     output_dir = os.path.join(script_dir, 'layouts')
     os.makedirs(output_dir, exist_ok=True)
 
-    if len(sys.argv) > 1:
+    force = '--force' in sys.argv[1:]
+    ext = '.svgz' if '--gzip' in sys.argv[1:] else '.svg'
+    names = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if names:
         files = []
-        for arg in sys.argv[1:]:
-            if arg.startswith('--'):
-                continue
+        for arg in names:
             path = (os.path.join(layouts_dir, arg)
                     if not os.path.isabs(arg) else arg)
             if os.path.exists(path):
@@ -763,19 +891,30 @@ def main():
             for f in os.listdir(layouts_dir) if f.endswith('.xml')
         )
 
+    script_mtime = os.stat(os.path.abspath(__file__)).st_mtime
+    paths = []
+    out_paths = []
     for path in files:
-        fname = os.path.basename(path)
-        layout_id, layout_name, entries = parse_layout(path)
-        variant = 'Standard' if '-standard' in fname else 'Optimized'
-        out_name = fname.replace('.xml', '.svg')
+        out_name = os.path.basename(path).replace('.xml', ext)
         out_path = os.path.join(output_dir, out_name)
+        if not force and is_up_to_date(path, out_path, script_mtime):
+            print(f'  = {out_path} (up to date)')
+            continue
+        paths.append(path)
+        out_paths.append(out_path)
+
+    # Layouts are independent and rendering is CPU-bound, so spread them
+    # across processes; a single layout is not worth the pool start-up.
+    if len(paths) > 1:
+        with ProcessPoolExecutor() as ex:
+            for out_path in ex.map(process_layout, paths, out_paths):
+                print(f'  \u2713 {out_path}')
+    else:
+        for out_path in map(process_layout, paths, out_paths):
+            print(f'  \u2713 {out_path}')
 
-        svg_content = generate_svg(layout_id, layout_name, entries, variant)
-        with open(out_path, 'w', encoding='utf-8') as f:
-            f.write(svg_content)
-        print(f'  \u2713 {out_path}')
-
-    print(f'\nDone: generated {len(files)} diagram(s) in {output_dir}')
+    print(f'\nDone: generated {len(paths)} diagram(s) in {output_dir}'
+          f' ({len(files) - len(paths)} up to date)')
 
 
 if __name__ == '__main__':
@@ -28,10 +28,14 @@ For other languages, provide a local bigram file in the same format
 
 import argparse
 import gzip
+import hashlib
+import io
+import json
 import os
 import sys
 import urllib.request
-from collections import defaultdict
+from array import array
+from heapq import nlargest
 
 NORVIG_BIGRAM_URL = "https://norvig.com/ngrams/count_2w.txt"
 
@@ -39,99 +43,186 @@ SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
 WORDLIST_DIR = os.path.join(PROJECT_ROOT, "app", "src", "main", "assets", "wordlists")
 OUTPUT_DIR = os.path.join(PROJECT_ROOT, "app", "src", "main", "assets", "bigrams")
+CACHE_DIR = os.path.join(SCRIPT_DIR, ".cache")
 
 
 def load_wordlist(lang):
-    """Load the set of known words for a language."""
+    """Load the (frozen) set of known words for a language.
+
+    Returns (words, digest), where digest is the sha256 of the file as
+    read, for keying the ranking cache without reading it a second time."""
     path = os.path.join(WORDLIST_DIR, f"{lang}.txt")
     if not os.path.exists(path):
         sys.exit(f"Word list not found: {path}")
-    words = set()
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            parts = line.strip().split(" ", 1)
-            if parts:
-                words.add(parts[0].lower())
+    with open(path, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    text = data.decode("utf-8").lower()
+    intern = sys.intern
+    words = {intern(line.strip().split(" ", 1)[0])
+             for line in text.split("\n")}
+    words.discard("")
     print(f"Loaded {len(words)} words from {lang}.txt")
-    return words
+    return frozenset(words), digest
+
+
+def read_bigram_file(path):
+    """Return the text of a local bigram file."""
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
 
 
 def download_norvig_bigrams(cache_path):
-    """Download Norvig's bigram file, caching locally."""
+    """Return Norvig's bigram data, downloading and caching it locally.
+
+    A fresh download is parsed straight from memory; the cache file is
+    only written for the next run, never read back."""
     if os.path.exists(cache_path):
         print(f"Using cached bigram data: {cache_path}")
-        return
+        return read_bigram_file(cache_path)
     print(f"Downloading {NORVIG_BIGRAM_URL} ...")
-    urllib.request.urlretrieve(NORVIG_BIGRAM_URL, cache_path)
+    with urllib.request.urlopen(NORVIG_BIGRAM_URL) as resp:
+        data = resp.read()
+    with open(cache_path, "wb") as f:
+        f.write(data)
     print(f"Saved to {cache_path}")
+    return data.decode("utf-8")
 
 
-def parse_bigrams(path):
-    """Parse a bigram file.  Supports Norvig format (word1 word2<TAB>count)
+def parse_bigrams(text):
+    """Parse bigram data.  Supports Norvig format (word1 word2<TAB>count)
     and generic three-column format (word1<TAB>word2<TAB>count or
-    word1 word2 count)."""
-    bigrams = []
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            # Norvig format: "word1 word2\tcount"
-            if "\t" in line:
-                phrase, _, count_str = line.partition("\t")
-                words = phrase.split()
-                if len(words) == 2:
-                    try:
-                        bigrams.append((words[0].lower(), words[1].lower(),
-                                        int(count_str.strip())))
-                    except ValueError:
-                        pass
-                    continue
-            # Fallback: space-separated "word1 word2 count"
-            parts = line.split()
-            if len(parts) >= 3:
+    word1 word2 count).
+
+    Returns parallel columns (first_words, second_words, counts), with the
+    counts packed into an array of 64-bit ints rather than boxed in
+    per-row tuples."""
+    # Lowercase the whole text in one go, then split it into lines in C,
+    # rather than lowercasing line by line
+    lines = text.lower().split("\n")
+    w1s = []
+    w2s = []
+    counts = array("q")
+    # Common words recur on thousands of lines; interning keeps one string
+    # object per word and lets set lookups against the (also interned)
+    # word list succeed on identity
+    intern = sys.intern
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        # Norvig format: "word1 word2\tcount"
+        if "\t" in line:
+            phrase, _, count_str = line.partition("\t")
+            words = phrase.split()
+            if len(words) == 2:
+                # Counts of 2**63 and up do not fit the int64 column; drop
+                # them like any other malformed count instead of crashing
                 try:
-                    bigrams.append((parts[0].lower(), parts[1].lower(),
-                                    int(parts[2])))
-                except ValueError:
-                    continue
-    print(f"Parsed {len(bigrams)} raw bigram entries")
-    return bigrams
+                    counts.append(int(count_str))
+                except (ValueError, OverflowError):
+                    pass
+                else:
+                    w1s.append(intern(words[0]))
+                    w2s.append(intern(words[1]))
+                continue
+        # Fallback: space-separated "word1 word2 count"
+        parts = line.split()
+        if len(parts) >= 3:
+            try:
+                counts.append(int(parts[2]))
+            except (ValueError, OverflowError):
+                continue
+            w1s.append(intern(parts[0]))
+            w2s.append(intern(parts[1]))
+    print(f"Parsed {len(counts)} raw bigram entries")
+    return w1s, w2s, counts
 
 
 def filter_and_group(bigrams, wordset, max_context, max_followers):
-    """Filter bigrams to known words, group by context, keep top followers."""
-    grouped = defaultdict(list)
-    for w1, w2, count in bigrams:
-        if w1 in wordset and w2 in wordset and w1 != w2:
-            grouped[w1].append((w2, count))
-
-    # Sort each context's followers by count descending, keep top N
-    for key in grouped:
-        grouped[key].sort(key=lambda x: x[1], reverse=True)
-        grouped[key] = grouped[key][:max_followers]
-
-    # Rank context words by total follower count, keep top M
-    ranked = sorted(grouped.items(),
-                    key=lambda x: sum(c for _, c in x[1]),
-                    reverse=True)
-    ranked = ranked[:max_context]
+    """Filter bigrams to known words, group by context, keep top followers.
+
+    bigrams is the (first_words, second_words, counts) columns returned
+    by parse_bigrams.  Returns [(context_word, [follower, ...]), ...] with
+    both levels in descending frequency order."""
+    w1s, w2s, counts = bigrams
+    # Keep the row numbers of known, distinct word pairs, then sort them by
+    # count once (stable, so equal counts keep file order) and take the
+    # first max_followers rows of each context, instead of sorting every
+    # context separately.  Contexts are created in file order first, which
+    # breaks ranking ties.
+    known = frozenset(wordset)  # no copy if already frozen
+    rows = [i for i, w1, w2 in zip(range(len(w1s)), w1s, w2s)
+            if w1 in known and w2 in known and w1 != w2]
+    grouped = {w1s[i]: [] for i in rows}
+    totals = dict.fromkeys(grouped, 0)
+    rows.sort(key=counts.__getitem__, reverse=True)
+    for i in rows:
+        w1 = w1s[i]
+        followers = grouped[w1]
+        if len(followers) < max_followers:
+            followers.append(w2s[i])
+            totals[w1] += counts[i]
+
+    # Rank context words by total follower count (tallied above), keep top
+    # M; heap selection keeps tied contexts in order, as sorted() would
+    top = nlargest(max_context, totals, key=totals.__getitem__)
+    ranked = [(w, grouped[w]) for w in top]
 
     total = sum(len(followers) for _, followers in ranked)
     print(f"Filtered to {len(ranked)} context words, {total} bigram entries")
     return ranked
 
 
+def ranking_cache_key(wordlist_digest, text, max_context, max_followers):
+    """Digest of everything the ranking depends on: word list (as hashed by
+    load_wordlist), bigram data, limits, and this script's own source."""
+    h = hashlib.sha256(wordlist_digest.encode("ascii"))
+    with open(os.path.abspath(__file__), "rb") as f:
+        h.update(f.read())
+    h.update(text.encode("utf-8"))
+    h.update(f"{max_context},{max_followers}".encode("ascii"))
+    return h.hexdigest()
+
+
+def load_cached_ranking(lang, key):
+    """Return the cached ranking for lang if it was built from key."""
+    path = os.path.join(CACHE_DIR, f"{lang}-ranked.json")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cached.get("key") != key:
+        return None
+    print(f"Using cached ranking: {path}")
+    return [(context_word, followers)
+            for context_word, followers in cached["ranked"]]
+
+
+def save_cached_ranking(lang, key, ranked):
+    """Store ranked for reuse by the next run with the same inputs."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = os.path.join(CACHE_DIR, f"{lang}-ranked.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"key": key, "ranked": ranked}, f, ensure_ascii=False)
+
+
 def write_output(ranked, lang):
     """Write the compressed bigram file."""
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     path = os.path.join(OUTPUT_DIR, f"{lang}.gz")
-    total_entries = 0
-    with gzip.open(path, "wt", encoding="utf-8") as f:
-        for context_word, followers in ranked:
-            follower_words = [w for w, _ in followers]
-            f.write(f"{context_word}\t{','.join(follower_words)}\n")
-            total_entries += len(follower_words)
+    # Assemble the whole (small) file first so gzip sees one large write
+    # instead of one per context word; csv.writer is avoided because it
+    # would quote words containing quote characters
+    body = "".join(f"{context_word}\t{','.join(followers)}\n"
+                   for context_word, followers in ranked)
+    total_entries = sum(len(followers) for _, followers in ranked)
+    # Fixed level and a zero timestamp make the asset byte-identical across
+    # runs for the same input, so rebuilding it does not churn the APK
+    with gzip.GzipFile(path, "wb", compresslevel=9, mtime=0) as gz, \
+            io.TextIOWrapper(gz, encoding="utf-8", newline="\n") as f:
+        f.write(body)
     size = os.path.getsize(path)
     print(f"Wrote {total_entries} entries ({len(ranked)} context words) "
           f"to {path} ({size:,} bytes)")
@@ -150,18 +241,24 @@ def main():
                         help="Max followers per context word (default: 10)")
     args = parser.parse_args()
 
-    wordset = load_wordlist(args.lang)
+    wordset, wordlist_digest = load_wordlist(args.lang)
 
     if args.input:
-        bigram_path = args.input
+        text = read_bigram_file(args.input)
     else:
-        cache_dir = os.path.join(SCRIPT_DIR, ".cache")
-        os.makedirs(cache_dir, exist_ok=True)
-        bigram_path = os.path.join(cache_dir, "count_2w.txt")
-        download_norvig_bigrams(bigram_path)
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        text = download_norvig_bigrams(os.path.join(CACHE_DIR, "count_2w.txt"))
 
-    bigrams = parse_bigrams(bigram_path)
-    ranked = filter_and_group(bigrams, wordset, args.max_context, args.max_followers)
+    # Parsing and filtering dominate the run time; skip both when neither
+    # the inputs, the limits nor the script changed since the last run
+    key = ranking_cache_key(wordlist_digest, text, args.max_context,
+                            args.max_followers)
+    ranked = load_cached_ranking(args.lang, key)
+    if ranked is None:
+        bigrams = parse_bigrams(text)
+        ranked = filter_and_group(bigrams, wordset, args.max_context,
+                                  args.max_followers)
+        save_cached_ranking(args.lang, key, ranked)
     write_output(ranked, args.lang)
     print("Done.")
 